@@ -0,0 +1,34 @@
+"""Audio download endpoints."""
+
+import logging
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.infrastructure.worker import DOWNLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/download/{video_id}")
+async def download_audio(video_id: str):
+    opus_path = next(DOWNLOAD_DIR.glob(f"{video_id}_*.opus"), None)
+    if opus_path is None:
+        raise HTTPException(status_code=404, detail="audio not found")
+    # Cleanup can remove the file between the glob and this stat, so a miss
+    # here is still just "not found", not a 500.
+    try:
+        stat_result = opus_path.stat()
+    except OSError:
+        raise HTTPException(status_code=404, detail="audio not found")
+    # FileResponse lets the server hand the file to sendfile(2) — the bytes
+    # never pass through Python. Passing stat_result up front saves
+    # Starlette its own stat call when building the headers.
+    return FileResponse(
+        path=opus_path,
+        stat_result=stat_result,
+        media_type="audio/ogg",
+        filename=opus_path.name,
+    )
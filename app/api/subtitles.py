@@ -0,0 +1,51 @@
+"""Subtitle generation endpoint."""
+
+import logging
+import uuid
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from app.infrastructure.subtitle_generator import SubtitleGenerator
+from app.infrastructure.worker import VideoTooLongError, extract_video_id
+from app.rate_limit import (
+    acquire_download_lock,
+    hit_rate_limit,
+    release_download_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+_GENERATOR = SubtitleGenerator()
+
+
+class SubtitleRequest(BaseModel):
+    url: str
+    target_language: str = "ru"
+
+
+@router.post("/subtitles")
+async def generate_subtitles(req: SubtitleRequest, request: Request):
+    from app.main import MODELS_READY  # lazy: app.main imports this router
+
+    if not MODELS_READY.is_set():
+        raise HTTPException(status_code=503, detail="models are still loading")
+    client_host = request.client.host if request.client else "unknown"
+    if await hit_rate_limit(f"rl:{client_host}"):
+        raise HTTPException(status_code=429, detail="rate limit exceeded")
+    video_id = extract_video_id(req.url)
+    if video_id is None:
+        raise HTTPException(status_code=400, detail="not a YouTube video URL")
+    owner = uuid.uuid4().hex
+    if not await acquire_download_lock(video_id, owner):
+        raise HTTPException(
+            status_code=409, detail="this video is already being processed"
+        )
+    try:
+        return await _GENERATOR.generate_subtitles(req.url, req.target_language)
+    except VideoTooLongError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    finally:
+        await release_download_lock(video_id)
@@ -0,0 +1,65 @@
+"""Read-side repository for the Berios video catalog."""
+
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from app.mongo_client import get_db, normalize_mongo_doc
+
+logger = logging.getLogger(__name__)
+
+try:  # optional fast path: BSON -> Arrow -> dicts, all in C
+    import pyarrow as pa
+    from pymongoarrow.api import find_arrow_all
+    from pymongoarrow.schema import Schema
+    from pymongoarrow.types import ObjectIdType
+except ImportError:  # pragma: no cover - pymongoarrow is optional
+    find_arrow_all = None
+
+_CATALOG_SORT = [("updated_at", -1), ("title", 1)]
+
+if find_arrow_all is not None:
+    _CATALOG_SCHEMA = Schema({
+        "_id": ObjectIdType(),
+        "video_id": pa.string(),
+        "title": pa.string(),
+        "duration_sec": pa.int64(),
+        "language": pa.string(),
+        "updated_at": pa.timestamp("ms"),
+    })
+
+
+class BeriosVideoCatalogRepository:
+    """Lists the videos available for subtitle generation."""
+
+    def __init__(self, collection_name: str = "videos") -> None:
+        self._collection_name = collection_name
+
+    async def list_available_videos(self) -> List[Dict[str, Any]]:
+        collection = get_db()[self._collection_name]
+        if find_arrow_all is not None:
+            try:
+                # motor wraps a plain pymongo collection (.delegate), which is
+                # what pymongoarrow binds to. The BSON -> Arrow decode and the
+                # to_pylist materialization both run in C, skipping the
+                # per-document Python normalize_mongo_doc pass.
+                table = await asyncio.to_thread(
+                    find_arrow_all,
+                    collection.delegate,
+                    {},
+                    schema=_CATALOG_SCHEMA,
+                    sort=_CATALOG_SORT,
+                )
+                docs = table.to_pylist()
+                for doc in docs:
+                    oid = doc.get("_id")
+                    if isinstance(oid, bytes):
+                        doc["_id"] = oid.hex()
+                    updated_at = doc.get("updated_at")
+                    if updated_at is not None and not isinstance(updated_at, str):
+                        doc["updated_at"] = updated_at.isoformat()
+                return docs
+            except Exception:
+                logger.exception("pymongoarrow catalog load failed; falling back")
+        docs = await collection.find({}).sort(_CATALOG_SORT).to_list(length=None)
+        return [normalize_mongo_doc(doc) for doc in docs]
@@ -0,0 +1,119 @@
+"""Micro-batching front end for the ASR engine.
+
+Single-file transcribe calls run Whisper at batch size 1, wasting the
+vectorization (and any GPU) capacity of the model. Concurrent requests are
+coalesced here into one batched call.
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = int(os.getenv("ASR_MAX_BATCH", "8"))
+MAX_WAIT_MS = int(os.getenv("ASR_MAX_WAIT_MS", "50"))
+
+
+def _audio_length(audio: Any) -> float:
+    """Rough length proxy used to group similar-sized inputs together."""
+    shape = getattr(audio, "shape", None)
+    if shape:
+        return float(shape[0])
+    if isinstance(audio, Path):
+        try:
+            return float(audio.stat().st_size)
+        except OSError:
+            return 0.0
+    return 0.0
+
+
+class BatchingTranscriber:
+    """Coalesces concurrent transcription jobs into one batched call.
+
+    Jobs land on a queue; a worker task pops up to ``MAX_BATCH`` of them,
+    waiting at most ``MAX_WAIT_MS`` for stragglers, sorts the batch by
+    audio length so padding waste stays low, and runs a single
+    ``transcribe_batch``. Results resolve each submitter's future.
+    """
+
+    def __init__(self, engine: Any) -> None:
+        self._engine = engine
+        self._queue: "asyncio.Queue[Tuple[Any, asyncio.Future]]" = asyncio.Queue()
+        self._worker: Optional["asyncio.Task[None]"] = None
+
+    async def submit(self, audio: Any) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+        await self._queue.put((audio, future))
+        # The put and this check run without a suspension point in between,
+        # so the worker cannot retire between them; a worker mid-timeout is
+        # handled on its side (it drains the queue before exiting).
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                # A submit() can land while the timeout is cancelling the
+                # getter: its item is queued but, since this task is not
+                # done yet, no new worker gets started. Exiting here would
+                # strand that item, so only retire when truly idle.
+                if not self._queue.empty():
+                    continue
+                return  # idle; the next submit() restarts the worker
+            batch = [first]
+            deadline = loop.time() + MAX_WAIT_MS / 1000.0
+            while len(batch) < MAX_BATCH:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            # Futures travel with their audio, so sorting keeps them paired
+            # and the original submitters still get their own results.
+            batch.sort(key=lambda item: _audio_length(item[0]))
+            audios = [audio for audio, _ in batch]
+            results = await asyncio.to_thread(self._transcribe_batch, audios)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _transcribe_batch(self, audios: List[Any]) -> List[Any]:
+        """Transcribe ``audios``, returning a result or an Exception per item.
+
+        A corrupt file must fail only its own submitter, not everyone it was
+        co-batched with: when the engine-level batch call raises, the batch
+        is replayed item by item so the healthy inputs still succeed.
+        """
+        transcribe_batch = getattr(self._engine, "transcribe_batch", None)
+        if transcribe_batch is not None and len(audios) > 1:
+            try:
+                return list(transcribe_batch(audios))
+            except Exception:
+                logger.exception(
+                    "batched transcribe failed, replaying %d items singly",
+                    len(audios),
+                )
+        results: List[Any] = []
+        for audio in audios:
+            try:
+                results.append(self._engine.transcribe(audio))
+            except Exception as exc:
+                results.append(exc)
+        return results
@@ -0,0 +1,459 @@
+"""Async subtitle pipeline: download -> transcode -> transcribe -> translate."""
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import httpx
+import numpy as np
+import yt_dlp
+
+from app.infrastructure.asr.batching import BatchingTranscriber
+from app.infrastructure.asr.factory import get_asr_engine
+from app.infrastructure.translation.argos_translate import get_argos_translator
+from app.infrastructure.worker import (
+    MAX_AUDIO_DURATION,
+    VideoTooLongError,
+    _YTDLP_CACHE_DIR,
+    _YTDLP_SEMAPHORE,
+    _require_ffmpeg,
+    _scratch_dir,
+    extract_video_id,
+)
+from app.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Direct audio fetch: number of concurrent range GETs per stream. YouTube
+# throttles single connections hard; parallel ranges restore bandwidth.
+AUDIO_FETCH_CONNECTIONS = int(os.getenv("AUDIO_FETCH_CONNECTIONS", "8"))
+_FETCH_CHUNK = 1 << 20
+
+# Direct youtubei/v1/player call for metadata: android client, matching the
+# parameters yt-dlp would send, but without its extractor dispatch and with
+# no concurrency cap — only actual downloads hold the semaphore.
+_INNERTUBE_URL = "https://www.youtube.com/youtubei/v1/player"
+_INNERTUBE_BODY = {
+    "context": {
+        "client": {
+            "clientName": "ANDROID",
+            "clientVersion": "19.09.37",
+            "androidSdkVersion": 30,
+        }
+    }
+}
+
+_HTTPX_CLIENT: Optional[httpx.AsyncClient] = None
+
+# Metadata cache: the innertube/yt-dlp extraction is a network round trip
+# that re-runs on every retry and every repeat request for the same video.
+_INFO_CACHE_TTL = int(os.getenv("INFO_CACHE_TTL", "3600"))
+
+
+def _info_cache_key(video_id: str) -> str:
+    return f"info:{video_id}"
+
+
+def _info_cache_subset(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the fields the pipeline reads; full yt-dlp info is huge."""
+    return {
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "duration": info.get("duration"),
+        "uploader": info.get("uploader"),
+        "audio_url": info.get("audio_url"),
+        "formats": [
+            {
+                key: fmt.get(key)
+                for key in ("format_id", "url", "mime_type", "filesize")
+            }
+            for fmt in info.get("formats") or []
+        ],
+    }
+
+
+def _stream_urls_expired(info: Dict[str, Any]) -> bool:
+    """Googlevideo stream URLs carry their expiry as an ``expire`` query
+    parameter; a cached entry with any lapsed URL is useless for download."""
+    for fmt in info.get("formats") or []:
+        url = fmt.get("url")
+        if not url:
+            continue
+        expire = parse_qs(urlparse(url).query).get("expire", [None])[0]
+        if expire and expire.isdigit() and int(expire) <= time.time():
+            return True
+    return False
+
+
+_BATCHER: Optional[BatchingTranscriber] = None
+
+
+def _get_batcher(engine: Any) -> BatchingTranscriber:
+    """One process-wide batcher so concurrent requests share Whisper batches."""
+    global _BATCHER
+    if _BATCHER is None:
+        _BATCHER = BatchingTranscriber(engine)
+    return _BATCHER
+
+
+def _get_httpx_client() -> httpx.AsyncClient:
+    global _HTTPX_CLIENT
+    if _HTTPX_CLIENT is None:
+        _HTTPX_CLIENT = httpx.AsyncClient(timeout=10.0)
+    return _HTTPX_CLIENT
+
+
+class SubtitleGenerator:
+    """Produces translated subtitle segments for a YouTube video."""
+
+    def __init__(self, target_language: str = "ru") -> None:
+        self.target_language = target_language
+        # Persistent YoutubeDL instances, one per purpose, guarded by
+        # threading locks (these run inside asyncio.to_thread, not on the
+        # loop, so asyncio.Lock would be the wrong primitive).
+        self._ydl_probe = yt_dlp.YoutubeDL(
+            {"quiet": True, "skip_download": True, "cachedir": _YTDLP_CACHE_DIR}
+        )
+        self._probe_lock = threading.Lock()
+        # No FFmpegExtractAudio here: the pipeline decodes whatever container
+        # arrives straight to PCM, so a download-then-re-encode-to-opus stage
+        # would serialize an encode pass nothing ever reads.
+        dl_opts = self._yt_dlp_base_opts()
+        dl_opts["cachedir"] = _YTDLP_CACHE_DIR
+        self._ydl_dl = yt_dlp.YoutubeDL(dl_opts)
+        self._dl_lock = threading.Lock()
+        atexit.register(self._ydl_probe.close)
+        atexit.register(self._ydl_dl.close)
+
+    async def generate_subtitles(self, url: str,
+                                 target_language: Optional[str] = None) -> Dict[str, Any]:
+        # The target only matters at the translate step, so one generator
+        # (and its persistent YoutubeDL instances) serves every language.
+        target = target_language or self.target_language
+        req_id = uuid.uuid4().hex[:8]
+        # Built once per request; %-style args below keep formatting lazy,
+        # so filtered-out levels cost nothing.
+        prefix = f"[REQ {req_id}]"
+        video_id = extract_video_id(url)
+        info = await self._get_cached_info(video_id)
+        if info is None:
+            info = await self._extract_info_fast(url)
+            if info is None:
+                logger.info("%s extracting info for %s", prefix, url)
+                info = await asyncio.to_thread(self._extract_info, url)
+            await self._cache_info(video_id, info)
+        # Gate on duration before any bytes move: past this point the video
+        # is fetched onto tmpfs and decoded into an in-memory waveform, so
+        # an unbounded VOD would chew through RAM, not just wall time.
+        duration = info.get("duration") or 0
+        if duration > MAX_AUDIO_DURATION:
+            raise VideoTooLongError(
+                f"video {video_id} is {duration}s long "
+                f"(limit {MAX_AUDIO_DURATION}s)"
+            )
+        logger.info("%s downloading audio: %s", prefix, info.get("title"))
+        audio_path = await self._download_audio_fast(info, req_id)
+        if audio_path is None:
+            audio_path = await asyncio.to_thread(self._download_audio, url, req_id)
+        try:
+            # The ffmpeg decode and the (possibly cold) ASR model load are
+            # independent; run them concurrently so the transcode hides
+            # behind the warm-up instead of queueing after it.
+            waveform, engine = await asyncio.gather(
+                self._optimize_audio_for_whisper(audio_path, req_id),
+                asyncio.to_thread(self._get_asr_engine),
+            )
+            logger.info("%s transcribing", prefix)
+            # Concurrent requests landing within the batching window get
+            # transcribed in one call instead of N serialized ones.
+            result = await _get_batcher(engine).submit(waveform)
+            segments = result.get("segments", [])
+            logger.info("%s translating %d segments", prefix, len(segments))
+            translated = await asyncio.to_thread(
+                get_argos_translator().translate_segments,
+                segments,
+                result.get("language") or "en",
+                target,
+            )
+            return {
+                "video": {
+                    "title": info.get("title"),
+                    "duration": info.get("duration"),
+                    "uploader": info.get("uploader"),
+                },
+                "language": target,
+                "segments": translated,
+            }
+        finally:
+            self._cleanup_temp_files(audio_path)
+
+    async def _get_cached_info(self, video_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Cached metadata for the video, or None on miss/expired URLs."""
+        if video_id is None:
+            return None
+        try:
+            raw = await get_redis_client().get(_info_cache_key(video_id))
+        except Exception:
+            return None
+        if not raw:
+            return None
+        try:
+            info = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if _stream_urls_expired(info):
+            try:
+                await get_redis_client().delete(_info_cache_key(video_id))
+            except Exception:
+                pass
+            return None
+        return info
+
+    async def _cache_info(self, video_id: Optional[str],
+                          info: Dict[str, Any]) -> None:
+        if video_id is None or not info:
+            return
+        try:
+            await get_redis_client().setex(
+                _info_cache_key(video_id),
+                _INFO_CACHE_TTL,
+                json.dumps(_info_cache_subset(info)),
+            )
+        except Exception:
+            pass  # the cache is best-effort; extraction still happened
+
+    async def _extract_info_fast(self, url: str) -> Optional[Dict[str, Any]]:
+        """Fetch title/duration with one innertube call; None means fall back."""
+        video_id = extract_video_id(url)
+        if video_id is None:
+            return None
+        try:
+            resp = await _get_httpx_client().post(
+                _INNERTUBE_URL, json={**_INNERTUBE_BODY, "videoId": video_id}
+            )
+            resp.raise_for_status()
+            data = resp.json()
+            details = data["videoDetails"]
+            formats = []
+            audio_url = None
+            for fmt in data.get("streamingData", {}).get("adaptiveFormats", []):
+                itag = str(fmt.get("itag"))
+                formats.append(
+                    {
+                        "format_id": itag,
+                        "url": fmt.get("url"),
+                        "mime_type": fmt.get("mimeType", ""),
+                    }
+                )
+                # Resolve the opus stream (itag 251, webm audio as backup)
+                # here, once, so the download path never scans the format
+                # list — cached entries carry the answer too.
+                if itag == "251":
+                    audio_url = fmt.get("url") or audio_url
+                elif audio_url is None and fmt.get("mimeType", "").startswith(
+                    "audio/webm"
+                ):
+                    audio_url = fmt.get("url")
+            return {
+                "id": video_id,
+                "title": details["title"],
+                "duration": int(details["lengthSeconds"]),
+                "uploader": details.get("author"),
+                "audio_url": audio_url,
+                "formats": formats,
+            }
+        except Exception as exc:
+            logger.debug("fast metadata path failed for %s: %s", url, exc)
+            return None
+
+    async def _download_audio_fast(self, info: Dict[str, Any],
+                                   req_id: str) -> Optional[Path]:
+        """Fetch the audio stream with concurrent range GETs over aiohttp.
+
+        Uses the direct stream URL resolved by the fast metadata path;
+        parallel ranges write into a preallocated temp file at the right
+        offsets, sidestepping YouTube's single-connection throttling without
+        blocking the event loop. Returns None when no direct URL is known
+        (callers fall back to the yt-dlp thread path).
+        """
+        stream_url = info.get("audio_url")
+        if not stream_url:
+            return None
+
+        with tempfile.NamedTemporaryFile(
+            suffix=".webm", delete=False, dir=_scratch_dir()
+        ) as f:
+            out_path = Path(f.name)
+        try:
+            timeout = aiohttp.ClientTimeout(total=600)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.head(stream_url) as resp:
+                    size = int(resp.headers.get("Content-Length") or 0)
+                    ranged = resp.headers.get("Accept-Ranges") == "bytes"
+
+                fd = os.open(out_path, os.O_RDWR)
+                try:
+                    if size and ranged:
+                        os.truncate(fd, size)
+                        part = -(-size // AUDIO_FETCH_CONNECTIONS)
+
+                        async def fetch_part(start: int) -> None:
+                            end = min(start + part, size) - 1
+                            headers = {"Range": f"bytes={start}-{end}"}
+                            async with session.get(
+                                stream_url, headers=headers
+                            ) as part_resp:
+                                part_resp.raise_for_status()
+                                offset = start
+                                async for chunk in part_resp.content.iter_chunked(
+                                    _FETCH_CHUNK
+                                ):
+                                    os.pwrite(fd, chunk, offset)
+                                    offset += len(chunk)
+
+                        await asyncio.gather(
+                            *(fetch_part(s) for s in range(0, size, part))
+                        )
+                    else:
+                        async with session.get(stream_url) as resp:
+                            resp.raise_for_status()
+                            offset = 0
+                            async for chunk in resp.content.iter_chunked(
+                                _FETCH_CHUNK
+                            ):
+                                os.pwrite(fd, chunk, offset)
+                                offset += len(chunk)
+                finally:
+                    os.close(fd)
+            return out_path
+        except Exception as exc:
+            out_path.unlink(missing_ok=True)
+            logger.debug("[REQ %s] direct audio fetch failed: %s", req_id, exc)
+            return None
+
+    def _extract_info(self, url: str) -> Dict[str, Any]:
+        with _YTDLP_SEMAPHORE, self._probe_lock:
+            return self._ydl_probe.extract_info(url, download=False)
+
+    def _yt_dlp_base_opts(self) -> Dict[str, Any]:
+        opts: Dict[str, Any] = {
+            # Ask for the opus 160 kbps itag outright so yt-dlp's format
+            # selector resolves it without ranking the whole format list.
+            "format": "251/bestaudio[ext=webm]/bestaudio",
+            "quiet": True,
+            "noprogress": True,
+        }
+        if shutil.which("aria2c"):
+            # aria2c holds connections open across fragments, removing the
+            # per-fragment TLS handshake that serializes DASH/HLS audio.
+            opts["external_downloader"] = "aria2c"
+            opts["external_downloader_args"] = {
+                "aria2c": ["-x", "16", "-s", "16", "-k", "1M", "--min-split-size=1M"]
+            }
+        else:
+            opts["concurrent_fragment_downloads"] = 16
+        return opts
+
+    def _download_audio(self, url: str, req_id: str) -> Path:
+        _require_ffmpeg()
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f"laarkh_{req_id}_", dir=_scratch_dir()))
+        try:
+            with _YTDLP_SEMAPHORE, self._dl_lock:
+                # The output template is per-request (unique temp dir), so
+                # it is the one option rewritten under the lock.
+                self._ydl_dl.params["outtmpl"] = {
+                    "default": str(tmp_dir / "audio.%(ext)s")
+                }
+                self._ydl_dl.extract_info(url, download=True)
+            audio_file = next(
+                (p for p in tmp_dir.glob("audio.*") if p.suffix != ".part"),
+                None,
+            )
+            if audio_file is None:
+                raise RuntimeError(f"[REQ {req_id}] no audio produced")
+            # NamedTemporaryFile reserves the name atomically (no TOCTOU,
+            # no mktemp existence-check loop); rename then replaces it.
+            with tempfile.NamedTemporaryFile(
+                suffix=audio_file.suffix, delete=False, dir=_scratch_dir()
+            ) as f:
+                temp_file = Path(f.name)
+            audio_file.rename(temp_file)
+            return temp_file
+        finally:
+            # The dir holds at most the audio file and a leftover .part;
+            # a flat unlink loop avoids rmtree's recursive stat walk.
+            try:
+                for name in os.listdir(tmp_dir):
+                    try:
+                        os.unlink(tmp_dir / name)
+                    except OSError:
+                        pass
+                os.rmdir(tmp_dir)
+            except OSError:
+                pass
+
+    async def _optimize_audio_for_whisper(self, audio_path: Path,
+                                          req_id: str) -> Union[Path, "np.ndarray"]:
+        """Produce the mono 16 kHz audio Whisper expects.
+
+        Non-WAV inputs (opus/webm) always need the conversion, so they go
+        straight to ffmpeg without probing; WAV inputs are checked by
+        reading the header with the wave module — a sub-millisecond pure
+        Python read instead of an ffprobe fork+exec.
+
+        The conversion streams raw s16le PCM from ffmpeg's stdout straight
+        into a float32 array, so no intermediate WAV is written to disk and
+        the ASR engine never re-reads and re-decodes a file.
+        """
+        if audio_path.suffix.lower() == ".wav":
+            try:
+                with wave.open(str(audio_path), "rb") as wav:
+                    if (
+                        wav.getframerate() == WHISPER_SAMPLE_RATE
+                        and wav.getnchannels() == 1
+                    ):
+                        return audio_path
+            except wave.Error:
+                pass  # malformed header; let ffmpeg sort it out
+
+        ffmpeg = _require_ffmpeg()
+        proc = await asyncio.create_subprocess_exec(
+            ffmpeg, "-nostdin",
+            "-i", str(audio_path),
+            "-f", "s16le", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE),
+            "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        buf, _ = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"[REQ {req_id}] ffmpeg decode failed with code {proc.returncode}"
+            )
+        return np.frombuffer(buf, np.int16).astype(np.float32) / 32768.0
+
+    def _get_asr_engine(self) -> Any:
+        return get_asr_engine()
+
+    def _cleanup_temp_files(self, *paths: Any) -> None:
+        for path in paths:
+            if not isinstance(path, Path):
+                continue  # in-memory waveforms have nothing to clean up
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
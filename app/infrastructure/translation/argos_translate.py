@@ -0,0 +1,429 @@
+"""Argos Translate integration for subtitle segment translation.
+
+Segments are dicts with at least a ``text`` key (plus ``start``/``end``
+timing carried through untouched). The primary path batches all segment
+texts into the underlying CTranslate2 model in length-sorted mini-batches;
+the per-segment loop remains as a fallback when the package internals are
+not reachable.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import argostranslate.package as argos_package
+    import argostranslate.translate as argos_translate
+except ImportError:  # pragma: no cover - translation is an optional feature
+    argos_package = None
+    argos_translate = None
+
+from app.infrastructure.translation._argos_fast import copy_segment as _copy_segment
+
+# Mini-batch limits for the CTranslate2 path: small enough to keep padding
+# waste low once inputs are length-sorted, large enough to fill the cores.
+_SUB_BATCH_SIZE = 32
+_MAX_BATCH_TOKENS = 2000
+
+# Package downloads: number of parallel byte-range fetches and the size
+# below which a plain single GET is cheaper than the range dance.
+_RANGE_THREADS = 4
+_RANGE_MIN_SIZE = 4 * 1024 * 1024
+
+
+# Loaded language pairs kept resident at once; each holds a CTranslate2
+# model mapping, so the bound is effectively a memory budget.
+_PAIR_CACHE_SIZE = 8
+
+# Finished translations keyed by (source, target, normalized text). Videos
+# repeat intros/outros/filler constantly; every hit saves a full
+# autoregressive decode, which dwarfs the cost of the lookup.
+_TEXT_CACHE_SIZE = 4096
+
+
+class TranslationNotAvailableError(Exception):
+    """Raised when no Argos package covers the requested language pair."""
+
+
+class _LRUCache:
+    """Small thread-safe LRU; evicted entries are reported to ``on_evict``."""
+
+    def __init__(self, maxsize: int,
+                 on_evict: Optional[Callable[[Any, Any], None]] = None) -> None:
+        self._maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._on_evict = on_evict
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Any, value: Any) -> None:
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                evicted.append(self._data.popitem(last=False))
+        # Run eviction hooks outside the lock; they may release model memory.
+        if self._on_evict is not None:
+            for old_key, old_value in evicted:
+                self._on_evict(old_key, old_value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+def _fetch_url_to_file(url: str) -> Path:
+    """Download ``url`` to a temp file, using parallel range GETs when possible."""
+    import requests
+
+    head = requests.head(url, allow_redirects=True, timeout=30)
+    head.raise_for_status()
+    size = int(head.headers.get("Content-Length") or 0)
+    ranged = head.headers.get("Accept-Ranges") == "bytes" and size >= _RANGE_MIN_SIZE
+
+    fd, tmp_name = tempfile.mkstemp(suffix=".argosmodel")
+    tmp_path = Path(tmp_name)
+    try:
+        if ranged:
+            os.truncate(fd, size)
+            part = -(-size // _RANGE_THREADS)  # ceil division
+
+            def fetch_part(start: int) -> None:
+                end = min(start + part, size) - 1
+                resp = requests.get(
+                    url,
+                    headers={"Range": f"bytes={start}-{end}"},
+                    stream=True,
+                    timeout=60,
+                )
+                resp.raise_for_status()
+                offset = start
+                for chunk in resp.iter_content(1 << 20):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+
+            with ThreadPoolExecutor(max_workers=_RANGE_THREADS) as pool:
+                # list() propagates the first worker exception, if any
+                list(pool.map(fetch_part, range(0, size, part)))
+        else:
+            resp = requests.get(url, stream=True, timeout=60)
+            resp.raise_for_status()
+            offset = 0
+            for chunk in resp.iter_content(1 << 20):
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+        return tmp_path
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        os.close(fd)
+
+
+def _download_argos_package(pkg: Any) -> Path:
+    """Fetch a package archive, trying each mirror with ranged parallel GETs.
+
+    ``pkg.download()`` is a blocking single-stream fetch that stalls or dies
+    with IncompleteRead on slow links; it remains the last resort only.
+    """
+    for url in list(getattr(pkg, "links", None) or []):
+        try:
+            return _fetch_url_to_file(url)
+        except Exception as exc:
+            logger.warning("Argos mirror %s failed: %s", url, exc)
+    return Path(pkg.download())
+
+
+class _Ct2BatchBackend:
+    """Direct batch access to the CTranslate2 model inside an Argos package.
+
+    Argos translates one string per call; going straight at the package's
+    ``model``/``sentencepiece.model`` lets us decode a whole batch with
+    intra-batch parallelism and a single pass of Python overhead.
+    """
+
+    def __init__(self, package_path: Path) -> None:
+        import sentencepiece
+
+        model_dir = package_path / "model"
+        sp_path = package_path / "sentencepiece.model"
+        if not model_dir.is_dir() or not sp_path.is_file():
+            raise FileNotFoundError(f"unexpected package layout in {package_path}")
+        self._translator = self._load_translator(model_dir)
+        self._sp = sentencepiece.SentencePieceProcessor(model_file=str(sp_path))
+
+    @staticmethod
+    def _load_translator(model_dir: Path) -> Any:
+        import ctranslate2
+
+        # One translation runs at a time per backend, so give that batch all
+        # the cores (intra) and keep a single worker queue (inter) instead
+        # of CT2's fixed default of 4 intra threads.
+        thread_opts = {
+            "intra_threads": os.cpu_count() or 4,
+            "inter_threads": 1,
+        }
+        try:
+            # Argos ships FP32/FP16 weights; asking CT2 for int8 quantizes
+            # them at load time — half the memory bandwidth and VNNI int8
+            # dot-products on CPUs that have them, at equal output quality
+            # for these models. No offline conversion step needed.
+            return ctranslate2.Translator(
+                str(model_dir), compute_type="int8", **thread_opts
+            )
+        except Exception:
+            logger.warning(
+                "int8 load failed for %s; using the shipped precision", model_dir
+            )
+            return ctranslate2.Translator(str(model_dir), **thread_opts)
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        # Sort by length so each mini-batch pads to roughly uniform width,
+        # then restore the original order afterwards.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [""] * len(texts)
+        for start in range(0, len(order), _SUB_BATCH_SIZE):
+            chunk = order[start:start + _SUB_BATCH_SIZE]
+            # Batch-form encode: one C call tokenizes the whole chunk and
+            # releases the GIL, instead of a Python round-trip per string.
+            tokens = self._sp.encode([texts[i] for i in chunk], out_type=str)
+            outputs = self._translator.translate_batch(
+                tokens,
+                max_batch_size=_MAX_BATCH_TOKENS,
+                batch_type="tokens",
+                beam_size=1,
+            )
+            for i, output in zip(chunk, outputs):
+                results[i] = self._sp.decode(output.hypotheses[0])
+        return results
+
+
+class ArgosTranslator:
+    """Lazy-installing wrapper around Argos language pairs."""
+
+    def __init__(self) -> None:
+        if argos_translate is None:
+            raise RuntimeError("argostranslate is not installed")
+        self._lock = threading.Lock()
+        # (source, target) -> argos Translation object, bounded so long-lived
+        # workers touching many pairs do not grow without limit
+        self._translation_cache = _LRUCache(_PAIR_CACHE_SIZE,
+                                            on_evict=self._release_pair)
+        # (source, target) -> _Ct2BatchBackend or None when unavailable
+        self._batch_backends: Dict[Tuple[str, str], Optional[_Ct2BatchBackend]] = {}
+        # (source, target, normalized text) -> translated text
+        self._text_cache = _LRUCache(_TEXT_CACHE_SIZE)
+        # code -> installed Language; rebuilt lazily and after installs so
+        # pair lookups are O(1) instead of scanning get_installed_languages()
+        self._lang_index: Optional[Dict[str, Any]] = None
+
+    # -- package / language management ------------------------------------
+
+    def _refresh_lang_index(self) -> Dict[str, Any]:
+        self._lang_index = {
+            lang.code: lang for lang in argos_translate.get_installed_languages()
+        }
+        return self._lang_index
+
+    def _get_lang_index(self) -> Dict[str, Any]:
+        index = self._lang_index
+        if index is None:
+            index = self._refresh_lang_index()
+        return index
+
+    def _has_installed_pair(self, source: str, target: str) -> bool:
+        index = self._get_lang_index()
+        from_lang = index.get(source)
+        to_lang = index.get(target)
+        if from_lang is None or to_lang is None:
+            return False
+        return from_lang.get_translation(to_lang) is not None
+
+    def _install_pair(self, source: str, target: str) -> None:
+        argos_package.update_package_index()
+        available = argos_package.get_available_packages()
+        pkg = next(
+            (p for p in available if p.from_code == source and p.to_code == target),
+            None,
+        )
+        if pkg is None:
+            raise TranslationNotAvailableError(
+                f"no Argos package for {source}->{target}"
+            )
+        logger.info("installing Argos package %s->%s", source, target)
+        # Fetch outside the lock so concurrent requests are not serialized
+        # behind the network; only the actual install mutates shared state.
+        path = _download_argos_package(pkg)
+        try:
+            with self._lock:
+                argos_package.install_from_path(path)
+                self._refresh_lang_index()
+        finally:
+            # install_from_path unpacks the archive into Argos's data dir;
+            # the multi-hundred-MB download itself is not needed afterwards.
+            path.unlink(missing_ok=True)
+
+    def _build_translation(self, source: str, target: str) -> Any:
+        index = self._get_lang_index()
+        from_lang = index.get(source)
+        to_lang = index.get(target)
+        if from_lang is None or to_lang is None:
+            raise TranslationNotAvailableError(
+                f"{source}->{target} not installed"
+            )
+        translation = from_lang.get_translation(to_lang)
+        if translation is None:
+            raise TranslationNotAvailableError(
+                f"{source}->{target} not installed"
+            )
+        return translation
+
+    def _release_pair(self, key: Tuple[str, str], translation: Any) -> None:
+        # Drop the matching batch backend so the CTranslate2 model map can
+        # actually be released along with the evicted Translation.
+        self._batch_backends.pop(key, None)
+        logger.info("evicted translation pair %s->%s from cache", *key)
+
+    def _get_translation(self, source: str, target: str) -> Any:
+        key = (source, target)
+        # Hits bypass the install lock entirely.
+        translation = self._translation_cache.get(key)
+        if translation is not None:
+            return translation
+        if not self._has_installed_pair(source, target):
+            self._install_pair(source, target)
+        with self._lock:
+            translation = self._translation_cache.get(key)
+            if translation is None:
+                translation = self._build_translation(source, target)
+                self._translation_cache.put(key, translation)
+            return translation
+
+    def _get_batch_backend(self, source: str, target: str) -> Optional[_Ct2BatchBackend]:
+        key = (source, target)
+        if key in self._batch_backends:
+            return self._batch_backends[key]
+        backend: Optional[_Ct2BatchBackend] = None
+        try:
+            pkg = next(
+                (
+                    p
+                    for p in argos_package.get_installed_packages()
+                    if p.from_code == source and p.to_code == target
+                ),
+                None,
+            )
+            if pkg is not None:
+                backend = _Ct2BatchBackend(Path(pkg.package_path))
+        except Exception:
+            logger.exception(
+                "CT2 batch backend unavailable for %s->%s", source, target
+            )
+        self._batch_backends[key] = backend
+        return backend
+
+    # -- translation -------------------------------------------------------
+
+    def translate_text(self, text: str, source: str = "en", target: str = "ru") -> str:
+        return self._get_translation(source, target).translate(text)
+
+    def translate_segments(self, segments: List[Dict[str, Any]],
+                           source: str = "en",
+                           target: str = "ru") -> List[Dict[str, Any]]:
+        if not segments:
+            return []
+        translation = self._get_translation(source, target)
+        return self._translate_segments(translation, source, target, segments)
+
+    def _translate_segments(self, translation: Any, source: str, target: str,
+                            segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        texts = [seg.get("text", "").strip() for seg in segments]
+        keys = [(source, target, text.lower()) for text in texts]
+
+        # Serve repeats from the text cache; only the misses hit the model.
+        results: List[Optional[str]] = [
+            text if not text else self._text_cache.get(key)
+            for text, key in zip(texts, keys)
+        ]
+        miss_indices = [i for i, result in enumerate(results) if result is None]
+        if miss_indices:
+            # Within one video many segments are word-for-word identical
+            # (music tags, filler, "yeah"); decode each distinct text once
+            # and fan the result back out.
+            unique: Dict[Tuple[str, str, str], str] = {}
+            for i in miss_indices:
+                unique.setdefault(keys[i], texts[i])
+            translated = self._translate_texts(
+                translation, source, target, list(unique.values())
+            )
+            for key, text in zip(unique, translated):
+                unique[key] = text
+                self._text_cache.put(key, text)
+            for i in miss_indices:
+                results[i] = unique[keys[i]]
+
+        return [
+            _copy_segment(seg, result)
+            for seg, result in zip(segments, results)
+        ]
+
+    def _translate_texts(self, translation: Any, source: str, target: str,
+                         texts: List[str]) -> List[str]:
+        backend = self._get_batch_backend(source, target)
+        if backend is not None:
+            try:
+                return backend.translate_batch(texts)
+            except Exception:
+                logger.exception("batch translation failed; falling back")
+
+        # Fallback: sequential per-segment decodes through the Argos API.
+        return [translation.translate(text) for text in texts]
+
+
+_TRANSLATOR_LOCK = threading.Lock()
+_TRANSLATOR_INSTANCE: Optional[ArgosTranslator] = None
+
+
+def get_argos_translator() -> ArgosTranslator:
+    global _TRANSLATOR_INSTANCE
+    # Double-checked: steady-state callers read the module global without
+    # touching the lock.
+    instance = _TRANSLATOR_INSTANCE
+    if instance is not None:
+        return instance
+    with _TRANSLATOR_LOCK:
+        if _TRANSLATOR_INSTANCE is None:
+            _TRANSLATOR_INSTANCE = ArgosTranslator()
+        return _TRANSLATOR_INSTANCE
+
+
+def prewarm_default_pair() -> None:
+    """Load (downloading if needed) the common en->ru pair ahead of traffic.
+
+    Called from the app's startup hook, not at import time: importing this
+    module must stay side-effect free — a worker or a test that merely
+    imports it should not kick off a multi-hundred-MB package download.
+    """
+    if argos_translate is None:
+        return
+    try:
+        get_argos_translator()._get_translation("en", "ru")
+        logger.info("Argos en->ru pair pre-warmed")
+    except Exception:
+        logger.exception("Argos pre-warm failed")
@@ -0,0 +1,265 @@
+"""Audio download worker: shared helpers, AudioDownloader and RQ entry points."""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
+MAX_AUDIO_DURATION = int(os.getenv("MAX_AUDIO_DURATION", "3600"))
+
+YTDLP_MAX_CONCURRENT = int(os.getenv("YTDLP_MAX_CONCURRENT", "2"))
+_YTDLP_SEMAPHORE = threading.Semaphore(YTDLP_MAX_CONCURRENT)
+
+# On-disk signature/player cache shared by all YoutubeDL instances, so the
+# deciphered player JS survives restarts instead of being re-JITed.
+_YTDLP_CACHE_DIR = os.getenv("YTDLP_CACHE_DIR", "/var/cache/ytdlp")
+
+# Fetched audio lives only long enough to be decoded into a waveform; on
+# tmpfs the write+read round trip is memory traffic instead of disk I/O.
+_SHM_DIR = "/dev/shm"
+
+# Matches the usual YouTube URL shapes in one pass. The previous
+# urlparse + parse_qs version allocated a parse result, a dict and lists
+# per call; a precompiled regex does neither. watch URLs may carry other
+# query parameters before v=, so it must appear either first or right
+# after a separating & — a bare [^#]*? bridge would also accept any
+# parameter whose name merely ends in v (somev=...).
+_YT_RE = re.compile(
+    r"^(?:https?://)?(?:www\.|m\.)?"
+    r"(?:youtu\.be/|youtube\.com/(?:watch\?(?:[^#]*&)?v=|embed/|shorts/))"
+    r"([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])"
+)
+
+
+class VideoTooLongError(Exception):
+    """Raised when a video exceeds MAX_AUDIO_DURATION."""
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Pull the 11-character video id out of the usual YouTube URL shapes."""
+    m = _YT_RE.match(url)
+    return m.group(1) if m else None
+
+
+def _scratch_dir() -> Optional[str]:
+    """tmpfs when the platform has it, else the tempfile default."""
+    return _SHM_DIR if os.path.isdir(_SHM_DIR) else None
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_ffmpeg_paths() -> "tuple[Optional[str], Optional[str]]":
+    """Locate ffmpeg/ffprobe, honouring FFMPEG_PATH/FFPROBE_PATH overrides.
+
+    Cached for the process lifetime: the binaries and env overrides do not
+    move at runtime (a restart picks up changes), and this is called on
+    every request, so the which/stat syscalls are paid exactly once.
+    """
+    env_ffmpeg = os.getenv("FFMPEG_PATH")
+    env_ffprobe = os.getenv("FFPROBE_PATH")
+    ffmpeg = (
+        env_ffmpeg
+        if env_ffmpeg and Path(env_ffmpeg).exists()
+        else shutil.which("ffmpeg")
+    )
+    ffprobe = (
+        env_ffprobe
+        if env_ffprobe and Path(env_ffprobe).exists()
+        else shutil.which("ffprobe")
+    )
+    return ffmpeg, ffprobe
+
+
+def _require_ffmpeg() -> str:
+    ffmpeg, _ = _resolve_ffmpeg_paths()
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not found; install it or set FFMPEG_PATH")
+    return ffmpeg
+
+
+class AudioDownloader:
+    """Downloads a video's audio track as ASR-ready mono 16 kHz opus."""
+
+    # Complexity 0 + voip: the output feeds straight into ASR, so
+    # maximum-effort encoding bought nothing but CPU time, and voip is
+    # the speech preset (lowdelay targets latency-critical network audio).
+    _OPUS_ENCODE_ARGS = [
+        "-vn", "-ac", "1", "-ar", "16000", "-b:a", "8k",
+        "-compression_level", "0", "-application", "voip",
+    ]
+
+    def __init__(self, download_dir: Optional[Path] = None) -> None:
+        self.download_dir = download_dir or DOWNLOAD_DIR
+        # One YoutubeDL for the life of the process: every construction
+        # re-initializes all extractors and re-loads cookies (~150 ms).
+        # YoutubeDL is not reentrant, so calls serialize on a lock; outtmpl
+        # uses %(id)s so no per-call options mutation is needed.
+        self._ydl = yt_dlp.YoutubeDL(self._ydl_opts())
+        self._ydl_lock = threading.Lock()
+        atexit.register(self._ydl.close)
+
+    def _ydl_opts(self) -> Dict[str, Any]:
+        return {
+            "format": "bestaudio/best",
+            "outtmpl": str(self.download_dir / "%(id)s_%(title).80s.%(ext)s"),
+            "postprocessors": [
+                {"key": "FFmpegExtractAudio", "preferredcodec": "opus"}
+            ],
+            "postprocessor_args": list(self._OPUS_ENCODE_ARGS),
+            "quiet": True,
+            "noprogress": True,
+            "cachedir": _YTDLP_CACHE_DIR,
+        }
+
+    @staticmethod
+    def _source_acodec(info: Dict[str, Any]) -> Optional[str]:
+        """Codec of the audio stream yt-dlp will pick for bestaudio."""
+        acodec = info.get("acodec")
+        if acodec and acodec != "none":
+            return acodec.split(".")[0]
+        audio_formats = [
+            fmt for fmt in info.get("formats") or []
+            if fmt.get("acodec") not in (None, "none")
+            and fmt.get("vcodec") in (None, "none")
+        ]
+        if not audio_formats:
+            return None
+        best = max(audio_formats, key=lambda fmt: fmt.get("abr") or 0)
+        return (best.get("acodec") or "").split(".")[0] or None
+
+    def download_audio(self, url: str) -> Dict[str, Any]:
+        video_id = extract_video_id(url)
+        if video_id is None:
+            raise ValueError(f"not a YouTube video URL: {url}")
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+
+        # One extract_info feeds both the duration gate and the download:
+        # the metadata, player JS and deciphered signatures are passed
+        # straight into process_ie_result instead of being fetched twice.
+        with _YTDLP_SEMAPHORE, self._ydl_lock:
+            ydl = self._ydl
+            info = ydl.extract_info(url, download=False)
+            duration = info.get("duration") or 0
+            if duration > MAX_AUDIO_DURATION:
+                raise VideoTooLongError(
+                    f"video {video_id} is {duration}s long "
+                    f"(limit {MAX_AUDIO_DURATION}s)"
+                )
+            # When the source track is already opus, dropping the encoder
+            # args makes FFmpegExtractAudio stream-copy into the Ogg
+            # container instead of running a full PCM decode + re-encode.
+            # The ASR path decodes once regardless, so nothing downstream
+            # needs the 16 kHz mono re-encode.
+            opus_passthrough = self._source_acodec(info) == "opus"
+            ydl.params["postprocessor_args"] = (
+                [] if opus_passthrough else list(self._OPUS_ENCODE_ARGS)
+            )
+            info = ydl.process_ie_result(info, download=True)
+
+        opus_path = next(self.download_dir.glob(f"{video_id}_*.opus"), None)
+        if opus_path is None:
+            raise RuntimeError(f"no opus output produced for {video_id}")
+        return {
+            "video_id": video_id,
+            "title": info.get("title"),
+            "duration": duration,
+            "path": str(opus_path),
+            "size_bytes": opus_path.stat().st_size,
+            "opus_passthrough": opus_passthrough,
+        }
+
+
+# One downloader per worker process; the persistent YoutubeDL inside it is
+# the whole point of not constructing one per job.
+_DOWNLOADER: Optional[AudioDownloader] = None
+
+
+def download_audio(url: str) -> Dict[str, Any]:
+    """RQ job entry point (enqueued by name from app.rq_client)."""
+    global _DOWNLOADER
+    if _DOWNLOADER is None:
+        _DOWNLOADER = AudioDownloader()
+    result = _DOWNLOADER.download_audio(url)
+    opus_path = Path(result["path"])
+    _cleanup_non_opus(result["video_id"], keep=opus_path)
+    probe = ffprobe_audio(opus_path, size_bytes=result["size_bytes"])
+    return {**result, **probe}
+
+
+def ffprobe_audio(path: Path, size_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Return codec/sample-rate/channels/bitrate of an audio file.
+
+    Ogg-opus headers are parsed in-process with mutagen — microseconds
+    against the ~50 ms fork+exec+JSON cost of an ffprobe subprocess, and
+    this runs on every download. ffprobe remains the fallback for files
+    mutagen cannot read.
+    """
+    try:
+        from mutagen.oggopus import OggOpus
+
+        audio = OggOpus(str(path))
+        duration = float(audio.info.length or 0.0)
+        if size_bytes is None:
+            size_bytes = path.stat().st_size
+        return {
+            "codec": "opus",
+            "sample_rate": int(getattr(audio.info, "sample_rate", 48000)),
+            "channels": int(audio.info.channels or 0),
+            "audio_duration": duration,
+            "bit_rate": int(size_bytes * 8 / duration) if duration else 0,
+        }
+    except Exception:
+        logger.debug("mutagen probe failed for %s, falling back to ffprobe", path)
+    _, ffprobe = _resolve_ffmpeg_paths()
+    if not ffprobe:
+        raise RuntimeError("ffprobe not found; install it or set FFPROBE_PATH")
+    out = subprocess.check_output(
+        [
+            ffprobe, "-v", "error", "-print_format", "json",
+            "-show_format", "-show_streams", str(path),
+        ]
+    )
+    data = json.loads(out)
+    stream = next(
+        (s for s in data.get("streams", []) if s.get("codec_type") == "audio"), {}
+    )
+    fmt = data.get("format", {})
+    return {
+        "codec": stream.get("codec_name"),
+        "sample_rate": int(stream.get("sample_rate") or 0),
+        "channels": int(stream.get("channels") or 0),
+        "audio_duration": float(fmt.get("duration") or 0.0),
+        "bit_rate": int(fmt.get("bit_rate") or 0),
+    }
+
+
+def _cleanup_non_opus(video_id: str, keep: Path) -> None:
+    """Drop download leftovers (webm/m4a/.part) for the video, keeping ``keep``.
+
+    One scandir pass instead of two globs: glob walks the directory and
+    builds a Path per entry each time, while DirEntry names come straight
+    from the getdents batch. ``keep`` is built from DOWNLOAD_DIR like the
+    scandir paths, so plain string comparison replaces the resolve() pair.
+    """
+    prefix = f"{video_id}_"
+    keep_path = str(keep)
+    with os.scandir(DOWNLOAD_DIR) as entries:
+        for entry in entries:
+            if not entry.name.startswith(prefix) or entry.path == keep_path:
+                continue
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,59 @@
+"""FastAPI application entry point."""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI
+
+from app.api import download, subtitles
+from app.infrastructure.asr.factory import initialize_asr
+from app.infrastructure.translation.argos_translate import prewarm_default_pair
+
+logger = logging.getLogger(__name__)
+
+def _flag(name: str) -> bool:
+    return os.getenv(name, "1") not in ("0", "false", "no")
+
+
+app = FastAPI(title="laarkh")
+if _flag("ENABLE_SUBTITLES"):
+    app.include_router(subtitles.router)
+if _flag("ENABLE_DOWNLOAD_API"):
+    app.include_router(download.router)
+
+# Set once the ASR model is loaded and warmed; handlers gate on it so early
+# requests cannot each trigger their own concurrent model load.
+MODELS_READY = asyncio.Event()
+
+
+async def _preload() -> None:
+    # Warm the common translation pair in parallel with the ASR load; it
+    # logs its own failures and must not hold MODELS_READY hostage.
+    asyncio.create_task(asyncio.to_thread(prewarm_default_pair))
+    try:
+        await asyncio.to_thread(initialize_asr)
+        logger.info("ASR model preloaded")
+        MODELS_READY.set()
+    except Exception:
+        logger.exception("ASR model preload failed")
+
+
+@app.on_event("startup")
+async def startup_event() -> None:
+    # asyncio.to_thread runs on the loop's default executor, which caps at
+    # min(32, cpu+4) threads; the pipeline parks threads on yt-dlp network
+    # waits and ASR compute, so give it headroom for downloads to overlap.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=2 * (os.cpu_count() or 1),
+            thread_name_prefix="laarkh",
+        )
+    )
+    asyncio.create_task(_preload())
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "models_ready": MODELS_READY.is_set()}
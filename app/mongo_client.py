@@ -0,0 +1,117 @@
+"""MongoDB access layer (motor) and user bookkeeping helpers."""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "laarkh")
+
+_SHARED_USER_ID = os.getenv("SHARED_USER_ID", "shared")
+
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    """Return the motor client bound to the running event loop.
+
+    Cached as an attribute on the loop object, same trick as
+    ``redis_client.get_redis_client``.
+    """
+    loop = asyncio._get_running_loop()
+    if loop is None:
+        raise RuntimeError("get_mongo_client() requires a running event loop")
+    client = getattr(loop, "_laarkh_mongo", None)
+    if client is None:
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+        loop._laarkh_mongo = client
+    return client
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    return get_mongo_client()[MONGO_DB]
+
+
+def normalize_mongo_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Make a Mongo document JSON-friendly: ObjectId -> str, datetime -> ISO."""
+    out: Dict[str, Any] = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            out[key] = str(value)
+        elif isinstance(value, datetime):
+            out[key] = value.isoformat()
+        elif isinstance(value, dict):
+            out[key] = normalize_mongo_doc(value)
+        elif isinstance(value, list):
+            out[key] = [
+                normalize_mongo_doc(v) if isinstance(v, dict)
+                else str(v) if isinstance(v, ObjectId)
+                else v.isoformat() if isinstance(v, datetime)
+                else v
+                for v in value
+            ]
+        else:
+            out[key] = value
+    return out
+
+
+# TEST_USER_IDS never changes within a process lifetime, so parse it once
+# at import instead of re-splitting the env var on every login.
+_TEST_USER_IDS = frozenset(
+    v.strip() for v in os.getenv("TEST_USER_IDS", "").split(",") if v.strip()
+)
+
+_TEST_IDS_TTL_SEC = 60.0
+_test_ids_cache: Set[str] = set()
+_test_ids_cached_at = 0.0
+
+
+def _is_test_user_from_env(user_id: Optional[str]) -> bool:
+    return bool(user_id) and user_id != _SHARED_USER_ID and user_id in _TEST_USER_IDS
+
+
+async def get_test_user_ids() -> Set[str]:
+    """Env-configured plus DB-flagged test users, refreshed at most every 60s."""
+    global _test_ids_cache, _test_ids_cached_at
+    now = time.monotonic()
+    if now - _test_ids_cached_at > _TEST_IDS_TTL_SEC:
+        docs = await get_db().users.find(
+            {"flags.is_test": True}, {"_id": 1}
+        ).to_list(length=None)
+        _test_ids_cache = {doc["_id"] for doc in docs} | set(_TEST_USER_IDS)
+        _test_ids_cached_at = now
+    return _test_ids_cache
+
+
+async def ensure_user(user_id: str,
+                      profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Upsert the user document and its stats row on login."""
+    db = get_db()
+    now = datetime.now(timezone.utc)
+    set_doc: Dict[str, Any] = {"last_login_at": now}
+    if profile:
+        set_doc.update(profile)
+    if _is_test_user_from_env(user_id):
+        set_doc["flags.is_test"] = True
+    # The two upserts touch independent collections; running them through
+    # asyncio.gather pipelines both writes on motor's socket pool instead of
+    # paying two sequential round-trips on every login.
+    await asyncio.gather(
+        db.users.update_one(
+            {"_id": user_id},
+            {"$set": set_doc, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        ),
+        db.user_stats.update_one(
+            {"_id": user_id},
+            {"$set": {"last_active_at": now}, "$inc": {"logins": 1}},
+            upsert=True,
+        ),
+    )
+    return {"_id": user_id, **set_doc}
@@ -0,0 +1,107 @@
+"""Rate limiting and per-video download locks.
+
+The naive shapes of these checks (INCR then conditional EXPIRE; SET NX EX
+then SETEX for the status key) cost two to three Redis round trips per
+request, and on the rate-limit path the RTT dominates. Each Lua script
+below runs server-side, atomically, in a single round trip. When Redis is
+unavailable the checks degrade to plain commands against whatever backend
+the resilient client is currently using.
+"""
+
+import logging
+import os
+from typing import Any, Optional, Tuple
+
+from app.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+DOWNLOAD_LOCK_TTL = int(os.getenv("DOWNLOAD_LOCK_TTL", "600"))
+
+_RATE_LIMIT_LUA = """
+local v = redis.call('INCR', KEYS[1])
+if v == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return v
+"""
+
+# Takes the download lock and writes the status key in one atomic step, so
+# no observer can ever see the lock held without a status (or vice versa).
+_DOWNLOAD_LOCK_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    redis.call('SETEX', KEYS[2], ARGV[2], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _scripts(client: Any) -> Optional[Tuple[Any, Any]]:
+    """Script objects registered once per client; None when the active
+    client cannot run Lua (in-memory fallback).
+
+    Honouring ``in_fallback()`` matters: attempting the scripts against a
+    dead server would pay a fresh connect timeout per check, twice per
+    request, exactly what the resilient client's mode switch avoids.
+    """
+    in_fallback = getattr(client, "in_fallback", None)
+    if in_fallback is not None and in_fallback():
+        return None
+    cached = getattr(client, "_laarkh_scripts", None)
+    if cached is None:
+        register = getattr(client, "register_script", None)
+        if register is None:
+            return None
+        cached = (register(_RATE_LIMIT_LUA), register(_DOWNLOAD_LOCK_LUA))
+        client._laarkh_scripts = cached
+    return cached
+
+
+async def hit_rate_limit(key: str, limit: int = RATE_LIMIT_PER_MINUTE,
+                         window: int = 60) -> bool:
+    """Count a hit against ``key``; True when the caller is over the limit."""
+    client = get_redis_client()
+    scripts = _scripts(client)
+    if scripts is not None:
+        try:
+            count = await scripts[0](keys=[key], args=[window])
+            return int(count) > limit
+        except Exception:
+            pass  # Redis trouble; fall through to the resilient commands
+    count = await client.incr(key)
+    if count == 1:
+        await client.expire(key, window)
+    return int(count) > limit
+
+
+async def acquire_download_lock(video_id: str, owner: str,
+                                ttl: int = DOWNLOAD_LOCK_TTL) -> bool:
+    """Atomically take the per-video lock and mark its status downloading."""
+    client = get_redis_client()
+    lock_key = f"{video_id}:downloading"
+    status_key = f"{video_id}:status"
+    scripts = _scripts(client)
+    if scripts is not None:
+        try:
+            taken = await scripts[1](
+                keys=[lock_key, status_key], args=[owner, ttl, "downloading"]
+            )
+            return bool(int(taken))
+        except Exception:
+            pass
+    # Non-atomic fallback: a raced duplicate download is wasteful but safe.
+    if await client.exists(lock_key):
+        return False
+    await client.setex(lock_key, ttl, owner)
+    await client.setex(status_key, ttl, "downloading")
+    return True
+
+
+async def release_download_lock(video_id: str) -> None:
+    client = get_redis_client()
+    try:
+        await client.delete(f"{video_id}:downloading", f"{video_id}:status")
+    except Exception:
+        pass  # the TTL reclaims the lock regardless
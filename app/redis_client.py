@@ -0,0 +1,433 @@
+"""Redis access layer: pooled asyncio client with an in-memory fallback.
+
+The app keeps working (sessions, rate limits) even when Redis is down by
+degrading to a process-local dict-backed store.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from redis import Redis as SyncRedis
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+
+# Session GET/SET and rate-limit INCR are tiny payloads issued from every
+# request handler; a small bounded pool of warm, keepalive'd connections
+# beats the default lazily-grown unbounded pool.
+REDIS_MAX_CONNECTIONS = int(
+    os.getenv("REDIS_MAX_CONNECTIONS", str(2 * (os.cpu_count() or 4)))
+)
+
+_KEEPALIVE_OPTIONS: Dict[int, int] = {}
+for _opt, _val in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 30), ("TCP_KEEPCNT", 3)):
+    if hasattr(socket, _opt):
+        _KEEPALIVE_OPTIONS[getattr(socket, _opt)] = _val
+
+_FALLBACK_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+# While in fallback, a real reconnect is attempted at most this often so a
+# short Redis outage does not disable the distributed paths for the rest of
+# the process lifetime, while a long one is not probed on every command.
+_RECONNECT_INTERVAL = float(os.getenv("REDIS_RECONNECT_INTERVAL", "30"))
+
+# Commands proxied through the resilient wrappers; the dispatch tables below
+# are built once per client so the hot path is a single dict lookup instead
+# of redis-py attribute machinery on every command.
+_PROXIED_METHODS = (
+    "ping",
+    "get",
+    "set",
+    "setex",
+    "delete",
+    "exists",
+    "incr",
+    "ttl",
+    "expire",
+)
+
+
+class InMemoryRedis:
+    """Tiny dict-backed stand-in used when Redis is unreachable.
+
+    Shared between the sync (RQ worker) and async (FastAPI) resilient
+    wrappers, so reads must not contend with writes across threads. Writers
+    mutate ``_store`` under the lock and then publish a fresh copy as
+    ``_snapshot``; readers only ever touch the snapshot, which is swapped
+    atomically (RCU-style) and never mutated, so the read path is lock-free.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # name -> (value, expires_at or None); mutated only under the lock
+        self._store: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._snapshot: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+    def _publish(self) -> None:
+        """Swap in a fresh read snapshot; must be called with the lock held."""
+        now = time.monotonic()
+        expired = [
+            name
+            for name, (_, expires_at) in self._store.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for name in expired:
+            del self._store[name]
+        self._snapshot = self._store.copy()
+
+    def _read_entry(self, name: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._snapshot.get(name)
+        if entry is None:
+            return None
+        _, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None  # stale entry; the next write prunes it
+        return entry
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, name: str) -> Any:
+        entry = self._read_entry(name)
+        return entry[0] if entry is not None else None
+
+    def set(self, name: str, value: Any) -> bool:
+        with self._lock:
+            self._store[name] = (value, None)
+            self._publish()
+        return True
+
+    def setex(self, name: str, seconds: int, value: Any) -> bool:
+        with self._lock:
+            self._store[name] = (value, time.monotonic() + seconds)
+            self._publish()
+        return True
+
+    def delete(self, *names: str) -> int:
+        removed = 0
+        with self._lock:
+            for name in names:
+                if self._store.pop(name, None) is not None:
+                    removed += 1
+            self._publish()
+        return removed
+
+    def exists(self, *names: str) -> int:
+        return sum(1 for name in names if self._read_entry(name) is not None)
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            entry = self._store.get(name)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= time.monotonic():
+                    entry = None
+            if entry is None:
+                value, expires_at = 0, None
+            value = int(value) + 1
+            self._store[name] = (value, expires_at)
+            self._publish()
+        return value
+
+    def ttl(self, name: str) -> int:
+        entry = self._read_entry(name)
+        if entry is None:
+            return -2
+        _, expires_at = entry
+        if expires_at is None:
+            return -1
+        return max(0, int(expires_at - time.monotonic()))
+
+    def expire(self, name: str, seconds: int) -> bool:
+        with self._lock:
+            entry = self._store.get(name)
+            if entry is None:
+                return False
+            self._store[name] = (entry[0], time.monotonic() + seconds)
+            self._publish()
+        return True
+
+
+class _Immediate:
+    """Pre-completed awaitable around a plain value.
+
+    ``await``-ing it produces the value without a coroutine frame or a trip
+    through the scheduler — the generator returns before its first yield.
+    """
+
+    __slots__ = ("_value",)
+
+    def __init__(self, value: Any) -> None:
+        self._value = value
+
+    def __await__(self):
+        return self._value
+        yield  # pragma: no cover - unreachable; makes this a generator
+
+
+class AsyncInMemoryRedis:
+    """Async facade over :class:`InMemoryRedis` for the asyncio code paths.
+
+    The backend answers synchronously, so every method returns an
+    :class:`_Immediate` instead of being an ``async def``: call sites still
+    ``await`` as usual, but no coroutine object is allocated per command
+    while the fallback is active.
+    """
+
+    def __init__(self, backend: InMemoryRedis) -> None:
+        self._backend = backend
+
+    def ping(self) -> "_Immediate":
+        return _Immediate(self._backend.ping())
+
+    def get(self, name: str) -> "_Immediate":
+        return _Immediate(self._backend.get(name))
+
+    def set(self, name: str, value: Any) -> "_Immediate":
+        return _Immediate(self._backend.set(name, value))
+
+    def setex(self, name: str, seconds: int, value: Any) -> "_Immediate":
+        return _Immediate(self._backend.setex(name, seconds, value))
+
+    def delete(self, *names: str) -> "_Immediate":
+        return _Immediate(self._backend.delete(*names))
+
+    def exists(self, *names: str) -> "_Immediate":
+        return _Immediate(self._backend.exists(*names))
+
+    def incr(self, name: str) -> "_Immediate":
+        return _Immediate(self._backend.incr(name))
+
+    def ttl(self, name: str) -> "_Immediate":
+        return _Immediate(self._backend.ttl(name))
+
+    def expire(self, name: str, seconds: int) -> "_Immediate":
+        return _Immediate(self._backend.expire(name, seconds))
+
+    def has_json_module(self) -> "_Immediate":
+        return _Immediate(False)
+
+    def in_fallback(self) -> bool:
+        return True
+
+
+class AsyncResilientRedis:
+    """Proxies commands to Redis, switching to the fallback on connection errors."""
+
+    def __init__(self, redis_client: Redis, fallback_client: AsyncInMemoryRedis) -> None:
+        self._redis = redis_client
+        self._fallback = fallback_client
+        self._fallback_table = {m: getattr(fallback_client, m) for m in _PROXIED_METHODS}
+        self._live_table = {m: getattr(redis_client, m) for m in _PROXIED_METHODS}
+        self._table = self._live_table
+        self._retry_at = 0.0
+
+    async def _maybe_recover(self) -> Dict[str, Any]:
+        """Ping the real server at most every _RECONNECT_INTERVAL seconds.
+
+        On success the live table is restored, so a brief Redis restart does
+        not leave the process on the in-memory fallback forever.
+        """
+        now = time.monotonic()
+        if now < self._retry_at:
+            return self._fallback_table
+        self._retry_at = now + _RECONNECT_INTERVAL
+        try:
+            await self._live_table["ping"]()
+        except _FALLBACK_ERRORS:
+            return self._fallback_table
+        logger.info("Redis reachable again; leaving in-memory fallback")
+        self._table = self._live_table
+        return self._live_table
+
+    async def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        table = self._table
+        if table is self._fallback_table:
+            table = await self._maybe_recover()
+        fn = table[method]
+        if table is not self._fallback_table:
+            try:
+                return await fn(*args, **kwargs)
+            except _FALLBACK_ERRORS as exc:
+                logger.warning(
+                    "Redis unavailable (%s); switching to in-memory fallback", exc
+                )
+                # Point the table at the fallback so later calls skip even
+                # the branch above.
+                self._table = self._fallback_table
+                self._retry_at = time.monotonic() + _RECONNECT_INTERVAL
+                fn = self._fallback_table[method]
+        return await fn(*args, **kwargs)
+
+    async def ping(self) -> bool:
+        return await self._call("ping")
+
+    async def get(self, name: str) -> Any:
+        return await self._call("get", name)
+
+    async def set(self, name: str, value: Any) -> bool:
+        return await self._call("set", name, value)
+
+    async def setex(self, name: str, seconds: int, value: Any) -> bool:
+        return await self._call("setex", name, seconds, value)
+
+    async def delete(self, *names: str) -> int:
+        return await self._call("delete", *names)
+
+    async def exists(self, *names: str) -> int:
+        return await self._call("exists", *names)
+
+    async def incr(self, name: str) -> int:
+        return await self._call("incr", name)
+
+    async def ttl(self, name: str) -> int:
+        return await self._call("ttl", name)
+
+    async def expire(self, name: str, seconds: int) -> bool:
+        return await self._call("expire", name, seconds)
+
+    def json(self) -> Any:
+        """Raw RedisJSON command interface; callers must handle fallback mode."""
+        return self._redis.json()
+
+    def register_script(self, script: str) -> Any:
+        """Server-side Lua via the raw client; callers must handle fallback."""
+        return self._redis.register_script(script)
+
+    def in_fallback(self) -> bool:
+        """True while commands are served by the in-memory fallback."""
+        return self._table is self._fallback_table
+
+    async def has_json_module(self) -> bool:
+        """True when the server exposes RedisJSON and we are not in fallback."""
+        if self._table is self._fallback_table:
+            return False
+        try:
+            modules = await self._redis.module_list()
+        except Exception:
+            return False
+        names = {m.get("name") for m in modules if isinstance(m, dict)}
+        return bool(names & {"ReJSON", "json"})
+
+
+class ResilientRedis:
+    """Sync counterpart of :class:`AsyncResilientRedis` for worker-side code."""
+
+    def __init__(self, redis_client: SyncRedis, fallback_client: InMemoryRedis) -> None:
+        self._redis = redis_client
+        self._fallback = fallback_client
+        self._fallback_table = {m: getattr(fallback_client, m) for m in _PROXIED_METHODS}
+        self._live_table = {m: getattr(redis_client, m) for m in _PROXIED_METHODS}
+        self._table = self._live_table
+        self._retry_at = 0.0
+
+    def _maybe_recover(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if now < self._retry_at:
+            return self._fallback_table
+        self._retry_at = now + _RECONNECT_INTERVAL
+        try:
+            self._live_table["ping"]()
+        except _FALLBACK_ERRORS:
+            return self._fallback_table
+        logger.info("Redis reachable again; leaving in-memory fallback")
+        self._table = self._live_table
+        return self._live_table
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        table = self._table
+        if table is self._fallback_table:
+            table = self._maybe_recover()
+        fn = table[method]
+        if table is not self._fallback_table:
+            try:
+                return fn(*args, **kwargs)
+            except _FALLBACK_ERRORS as exc:
+                logger.warning(
+                    "Redis unavailable (%s); switching to in-memory fallback", exc
+                )
+                self._table = self._fallback_table
+                self._retry_at = time.monotonic() + _RECONNECT_INTERVAL
+                fn = self._fallback_table[method]
+        return fn(*args, **kwargs)
+
+    def ping(self) -> bool:
+        return self._call("ping")
+
+    def get(self, name: str) -> Any:
+        return self._call("get", name)
+
+    def set(self, name: str, value: Any) -> bool:
+        return self._call("set", name, value)
+
+    def setex(self, name: str, seconds: int, value: Any) -> bool:
+        return self._call("setex", name, seconds, value)
+
+    def delete(self, *names: str) -> int:
+        return self._call("delete", *names)
+
+    def exists(self, *names: str) -> int:
+        return self._call("exists", *names)
+
+    def incr(self, name: str) -> int:
+        return self._call("incr", name)
+
+    def ttl(self, name: str) -> int:
+        return self._call("ttl", name)
+
+    def expire(self, name: str, seconds: int) -> bool:
+        return self._call("expire", name, seconds)
+
+
+_in_memory_client = InMemoryRedis()
+
+
+def _new_async_redis() -> Redis:
+    pool = BlockingConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=5,
+        socket_connect_timeout=5,
+        socket_keepalive=True,
+        socket_keepalive_options=_KEEPALIVE_OPTIONS,
+        decode_responses=True,
+    )
+    # redis-py sets TCP_NODELAY on every connection it opens, so the tiny
+    # GET/SET/INCR payloads are not held back by Nagle's algorithm.
+    return Redis(connection_pool=pool)
+
+
+_fallback_singleton = AsyncInMemoryRedis(_in_memory_client)
+
+
+def get_redis_client() -> "AsyncResilientRedis | AsyncInMemoryRedis":
+    """Return the resilient Redis client bound to the running event loop.
+
+    The client is cached as an attribute on the (long-lived) loop object
+    itself: one attribute access per call instead of a loop lookup plus a
+    dict probe. ``_get_running_loop`` is the C-level variant that returns
+    None instead of raising when called outside a loop.
+    """
+    loop = asyncio._get_running_loop()
+    if loop is None:
+        return _fallback_singleton
+    client = getattr(loop, "_laarkh_redis", None)
+    if client is None:
+        client = AsyncResilientRedis(
+            _new_async_redis(), AsyncInMemoryRedis(_in_memory_client)
+        )
+        loop._laarkh_redis = client
+    return client
@@ -0,0 +1,43 @@
+"""Enqueue background jobs on RQ."""
+
+import os
+from typing import Any
+
+from redis import Redis
+from rq import Queue
+
+from app.redis_client import REDIS_DB, REDIS_HOST, REDIS_PORT
+
+RQ_QUEUE_NAME = os.getenv("RQ_QUEUE_NAME", "laarkh")
+
+# redis-py clients are thread-safe and keep their own connection pool, so a
+# single cached instance serves every enqueue instead of paying a fresh
+# TCP connect per job.
+_SYNC_REDIS: Redis | None = None
+_QUEUE: Queue | None = None
+
+
+def _get_sync_redis() -> Redis:
+    global _SYNC_REDIS
+    if _SYNC_REDIS is None:
+        _SYNC_REDIS = Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            socket_keepalive=True,
+        )
+    return _SYNC_REDIS
+
+
+def get_rq_queue() -> Queue:
+    global _QUEUE
+    if _QUEUE is None:
+        _QUEUE = Queue(name=RQ_QUEUE_NAME, connection=_get_sync_redis())
+    return _QUEUE
+
+
+def enqueue_subtitle_job(video_url: str) -> Any:
+    """Queue a download/subtitle job for the given video URL."""
+    return get_rq_queue().enqueue(
+        "app.infrastructure.worker.download_audio", video_url, job_timeout=3600
+    )
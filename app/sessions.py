@@ -0,0 +1,159 @@
+"""Session storage on top of the resilient Redis client.
+
+Sessions live under ``session:{id}`` with a sliding TTL. When the server
+ships RedisJSON (redis-stack) they are stored as JSON documents and updated
+field-by-field server-side; otherwise they fall back to plain JSON-string
+blobs rewritten with SETEX.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from redis.exceptions import ResponseError
+
+from app.redis_client import _FALLBACK_ERRORS, get_redis_client
+
+SESSION_TTL_SEC = int(os.getenv("SESSION_TTL_SEC", "86400"))
+
+# Probed via MODULE LIST; None means "not checked yet". Reset whenever a
+# JSON command hits a connection error so the next call re-probes instead
+# of steering every session through a dead RedisJSON path forever.
+_rejson_available: Optional[bool] = None
+
+
+def _key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _use_rejson(redis: Any) -> bool:
+    global _rejson_available
+    if _rejson_available is None:
+        # A probe made while the in-memory fallback is active says nothing
+        # about the server, so don't let its False stick: leave the cache
+        # unset and re-probe once the client has reconnected.
+        if redis.in_fallback():
+            return False
+        _rejson_available = await redis.has_json_module()
+    return _rejson_available
+
+
+def _rejson_unreachable() -> None:
+    """Forget the probe result after a connection error on a JSON command.
+
+    The raw ``redis.json()`` interface bypasses the resilient dispatch, so
+    it is the callers here that must notice the outage and fall back; the
+    re-probe returns False while the in-memory fallback is active.
+    """
+    global _rejson_available
+    _rejson_available = None
+
+
+async def create_session(session_id: str, data: Optional[Dict[str, Any]] = None,
+                         ttl_sec: Optional[int] = None) -> Dict[str, Any]:
+    """Create (or overwrite) a session and return the stored dict."""
+    now = _now_iso()
+    session: Dict[str, Any] = {
+        "session_id": session_id,
+        "created_at": now,
+        "last_seen_at": now,
+        "ended_at": None,
+    }
+    if data:
+        session.update(data)
+    redis = get_redis_client()
+    ttl = ttl_sec if ttl_sec is not None else SESSION_TTL_SEC
+    if await _use_rejson(redis):
+        try:
+            await redis.json().set(_key(session_id), "$", session)
+            await redis.expire(_key(session_id), ttl)
+            return session
+        except _FALLBACK_ERRORS:
+            _rejson_unreachable()  # degrade to the resilient blob path
+    await redis.setex(
+        _key(session_id), ttl, json.dumps(session, ensure_ascii=False)
+    )
+    return session
+
+
+def _unwrap_root(doc: Any) -> Optional[Dict[str, Any]]:
+    # JSON.GET with a "$" path wraps the root object in a one-element list.
+    if isinstance(doc, list):
+        doc = doc[0] if doc else None
+    return doc if isinstance(doc, dict) else None
+
+
+async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    redis = get_redis_client()
+    if await _use_rejson(redis):
+        try:
+            return _unwrap_root(await redis.json().get(_key(session_id)))
+        except ResponseError:
+            pass  # legacy string-encoded session; read it as a blob
+        except _FALLBACK_ERRORS:
+            _rejson_unreachable()  # degrade to the resilient blob path
+    raw = await redis.get(_key(session_id))
+    if raw is None:
+        return None
+    return json.loads(raw)
+
+
+async def touch_session(session_id: str, updates: Optional[Dict[str, Any]] = None,
+                        ttl_sec: Optional[int] = None,
+                        preserve_ttl: bool = True) -> Optional[Dict[str, Any]]:
+    """Merge ``updates`` into the session and slide its TTL.
+
+    Heartbeats (updates that only move ``last_seen_at``) skip the rewrite
+    entirely: a single EXPIRE bumps the TTL. Content updates go through
+    JSON.MERGE when RedisJSON is present, sending only the changed fields
+    instead of re-encoding and resending the whole blob.
+    """
+    redis = get_redis_client()
+    key = _key(session_id)
+    updates = dict(updates or {})
+    updates.setdefault("last_seen_at", _now_iso())
+    ttl = ttl_sec if ttl_sec is not None else SESSION_TTL_SEC
+    heartbeat_only = preserve_ttl and set(updates) <= {"last_seen_at"}
+
+    if await _use_rejson(redis):
+        try:
+            if not await redis.expire(key, ttl):
+                return None
+            if not heartbeat_only:
+                await redis.json().merge(key, "$", updates)
+            session = _unwrap_root(await redis.json().get(key))
+            if session is not None:
+                session.update(updates)
+                return session
+            return None
+        except ResponseError:
+            pass  # legacy string-encoded session; fall through to the blob path
+        except _FALLBACK_ERRORS:
+            _rejson_unreachable()  # degrade to the resilient blob path
+
+    raw = await redis.get(key)
+    if raw is None:
+        return None
+    session = json.loads(raw)
+    session.update(updates)
+    if heartbeat_only:
+        await redis.expire(key, ttl)
+        return session
+    await redis.setex(key, ttl, json.dumps(session, ensure_ascii=False))
+    return session
+
+
+async def end_session(session_id: str,
+                      ttl_sec: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Mark the session as ended; the blob stays readable until the TTL runs out."""
+    now = _now_iso()
+    return await touch_session(
+        session_id,
+        {"ended_at": now, "last_seen_at": now},
+        ttl_sec=ttl_sec,
+    )
@@ -0,0 +1,43 @@
+"""Launch the API server.
+
+Defaults to one uvicorn worker per CPU with uvloop and httptools, which
+are the fast C implementations of the event loop and HTTP parser.
+
+A note on model sharing: uvicorn spawns its workers as fresh processes,
+so loading the ASR model here before uvicorn.run() only helps the
+single-worker case — spawned workers re-import the app and load their
+own copy. For true copy-on-write sharing of model weights across
+workers, run under gunicorn instead, which forks after --preload:
+
+    gunicorn app.main:app -k uvicorn.workers.UvicornWorker \
+        -w $(nproc) --preload
+
+With --preload, initialize_asr() runs once in the master (via the module
+import in app.main plus the startup preload) and the forked workers
+share the loaded tensors until a write touches them.
+"""
+
+import os
+
+import uvicorn
+
+from app.infrastructure.asr.factory import initialize_asr
+
+
+def main() -> None:
+    workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    if workers == 1:
+        # Single process: warm the model before accepting traffic.
+        initialize_asr()
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Tests for the ASR micro-batcher (dependency-free)."""
+
+import asyncio
+
+from app.infrastructure.asr.batching import BatchingTranscriber
+
+
+class RecordingEngine:
+    """Fake engine that records how calls arrive and fails on demand."""
+
+    def __init__(self, batch_raises: bool = False) -> None:
+        self.batch_sizes = []
+        self.single_calls = []
+        self.batch_raises = batch_raises
+
+    def transcribe(self, audio):
+        self.single_calls.append(audio)
+        if audio == "bad":
+            raise ValueError("corrupt audio")
+        return {"text": audio}
+
+    def transcribe_batch(self, audios):
+        self.batch_sizes.append(len(audios))
+        if self.batch_raises or "bad" in audios:
+            raise ValueError("corrupt audio in batch")
+        return [{"text": a} for a in audios]
+
+
+def test_concurrent_submits_are_coalesced():
+    engine = RecordingEngine()
+    batcher = BatchingTranscriber(engine)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(f"a{i}") for i in range(4)))
+
+    results = asyncio.run(run())
+    assert results == [{"text": f"a{i}"} for i in range(4)]
+    # All four landed before the batch window closed: one batched call.
+    assert engine.batch_sizes == [4]
+    assert engine.single_calls == []
+
+
+def test_single_submit_skips_the_batch_path():
+    engine = RecordingEngine()
+    batcher = BatchingTranscriber(engine)
+    result = asyncio.run(batcher.submit("solo"))
+    assert result == {"text": "solo"}
+    assert engine.batch_sizes == []
+    assert engine.single_calls == ["solo"]
+
+
+def test_worker_restarts_after_idle_retirement():
+    engine = RecordingEngine()
+    batcher = BatchingTranscriber(engine)
+
+    async def run():
+        first = await batcher.submit("one")
+        # Outlive the 1 s idle timeout so the worker task retires.
+        await asyncio.sleep(1.2)
+        assert batcher._worker is not None and batcher._worker.done()
+        second = await batcher.submit("two")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == {"text": "one"}
+    assert second == {"text": "two"}
+
+
+def test_bad_item_fails_only_its_own_future():
+    engine = RecordingEngine()
+    batcher = BatchingTranscriber(engine)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("one"),
+            batcher.submit("bad"),
+            batcher.submit("two"),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert results[0] == {"text": "one"}
+    assert isinstance(results[1], ValueError)
+    assert results[2] == {"text": "two"}
+    # The failed batch call was replayed item by item.
+    assert engine.batch_sizes == [3]
+    assert engine.single_calls == ["one", "bad", "two"]
+
+
+def test_engine_level_batch_failure_is_replayed_per_item():
+    engine = RecordingEngine(batch_raises=True)
+    batcher = BatchingTranscriber(engine)
+
+    async def run():
+        return await asyncio.gather(batcher.submit("x"), batcher.submit("y"))
+
+    results = asyncio.run(run())
+    assert results == [{"text": "x"}, {"text": "y"}]
+    assert engine.batch_sizes == [2]
+    assert sorted(engine.single_calls) == ["x", "y"]
@@ -0,0 +1,100 @@
+"""Tests for the in-memory Redis fallback store."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+from app import redis_client
+from app.redis_client import AsyncInMemoryRedis, InMemoryRedis, _Immediate
+
+
+class FakeClock:
+    """Stand-in for the time module; only monotonic() is used."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(redis_client, "time", fake)
+    return fake
+
+
+def test_set_get_delete_exists(clock):
+    store = InMemoryRedis()
+    assert store.get("k") is None
+    assert store.set("k", "v") is True
+    assert store.get("k") == "v"
+    assert store.exists("k", "missing") == 1
+    assert store.delete("k", "missing") == 1
+    assert store.get("k") is None
+
+
+def test_setex_expires_with_the_clock(clock):
+    store = InMemoryRedis()
+    store.setex("k", 10, "v")
+    assert store.get("k") == "v"
+    assert store.ttl("k") == 10
+    clock.now += 11
+    assert store.get("k") is None
+    assert store.ttl("k") == -2
+    assert store.exists("k") == 0
+
+
+def test_ttl_semantics(clock):
+    store = InMemoryRedis()
+    assert store.ttl("missing") == -2
+    store.set("k", "v")
+    assert store.ttl("k") == -1  # no expiry
+    assert store.expire("k", 5) is True
+    assert store.ttl("k") == 5
+    assert store.expire("missing", 5) is False
+
+
+def test_incr_counts_and_respects_expiry(clock):
+    store = InMemoryRedis()
+    assert store.incr("n") == 1
+    assert store.incr("n") == 2
+    store.expire("n", 10)
+    clock.now += 11
+    # The window elapsed, so the counter restarts.
+    assert store.incr("n") == 1
+
+
+def test_snapshot_is_refreshed_on_write(clock):
+    store = InMemoryRedis()
+    store.set("a", 1)
+    snapshot = store._snapshot
+    store.set("b", 2)
+    # Writers publish a fresh copy instead of mutating the old snapshot.
+    assert store._snapshot is not snapshot
+    assert "b" not in snapshot
+    assert store.get("a") == 1 and store.get("b") == 2
+
+
+def test_immediate_awaitable_returns_its_value():
+    async def run():
+        return await _Immediate(42)
+
+    assert asyncio.run(run()) == 42
+
+
+def test_async_facade_round_trip(clock):
+    backend = InMemoryRedis()
+    client = AsyncInMemoryRedis(backend)
+
+    async def run():
+        await client.setex("k", 10, "v")
+        value = await client.get("k")
+        count = await client.incr("n")
+        return value, count
+
+    assert asyncio.run(run()) == ("v", 1)
+    assert client.in_fallback() is True
@@ -0,0 +1,51 @@
+"""Tests for the translator's dependency-free helpers."""
+
+from app.infrastructure.translation._argos_fast import copy_segment
+from app.infrastructure.translation.argos_translate import _LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    evicted = []
+    cache = _LRUCache(maxsize=2, on_evict=lambda k, v: evicted.append((k, v)))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert evicted == [("a", 1)]
+    assert cache.get("a") is None
+    assert cache.get("b") == 2 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_get_refreshes_recency():
+    cache = _LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now the eviction candidate
+    cache.put("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_lru_put_overwrites_without_evicting():
+    evicted = []
+    cache = _LRUCache(maxsize=2, on_evict=lambda k, v: evicted.append((k, v)))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    assert evicted == []
+    assert cache.get("a") == 10
+    assert len(cache) == 2
+
+
+def test_lru_get_default():
+    cache = _LRUCache(maxsize=2)
+    assert cache.get("missing") is None
+    assert cache.get("missing", "fallback") == "fallback"
+
+
+def test_copy_segment_replaces_text_without_mutating_source():
+    segment = {"start": 0.0, "end": 1.5, "text": "hello"}
+    out = copy_segment(segment, "привет")
+    assert out == {"start": 0.0, "end": 1.5, "text": "привет"}
+    assert segment["text"] == "hello"
+    assert out is not segment
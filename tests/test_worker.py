@@ -0,0 +1,34 @@
+"""Tests for the URL parsing helpers in the download worker."""
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from app.infrastructure.worker import extract_video_id
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        (f"https://www.youtube.com/watch?v={VIDEO_ID}", VIDEO_ID),
+        (f"http://youtube.com/watch?v={VIDEO_ID}", VIDEO_ID),
+        (f"https://m.youtube.com/watch?v={VIDEO_ID}&t=10", VIDEO_ID),
+        (f"https://www.youtube.com/watch?t=10&v={VIDEO_ID}", VIDEO_ID),
+        (f"https://youtu.be/{VIDEO_ID}", VIDEO_ID),
+        (f"youtu.be/{VIDEO_ID}", VIDEO_ID),
+        (f"https://www.youtube.com/embed/{VIDEO_ID}", VIDEO_ID),
+        (f"https://www.youtube.com/shorts/{VIDEO_ID}", VIDEO_ID),
+        # A parameter whose name merely ends in v is not the v parameter.
+        ("https://www.youtube.com/watch?somev=AAAAAAAAAAA", None),
+        # Ids are exactly 11 characters.
+        ("https://www.youtube.com/watch?v=tooshort", None),
+        (f"https://example.com/watch?v={VIDEO_ID}", None),
+        ("https://www.youtube.com/playlist?list=PL0123456789A", None),
+        ("not a url", None),
+        ("", None),
+    ],
+)
+def test_extract_video_id(url, expected):
+    assert extract_video_id(url) == expected